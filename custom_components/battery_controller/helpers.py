@@ -4,7 +4,10 @@ from __future__ import annotations
 
 import logging
 import math
-from typing import Any
+from collections.abc import Callable, Mapping, Sequence
+from datetime import datetime
+from functools import lru_cache
+from typing import Any, NamedTuple
 
 from homeassistant.core import State
 from homeassistant.util import dt as dt_util
@@ -12,10 +15,56 @@ from homeassistant.util import dt as dt_util
 _LOGGER = logging.getLogger(__name__)
 
 
+class PriceForecast(NamedTuple):
+    """Price forecast with the interval of its entries."""
+
+    prices: list[float]
+    interval: int  # Minutes per entry
+
+
+# Parses one price attribute format from the state attributes at the given time
+_PriceParser = Callable[[Mapping[str, Any], datetime], PriceForecast]
+
+
+# Default hourly consumption pattern (relative to base), 00:00 - 23:00
+_HOURLY_CONSUMPTION_PATTERN: tuple[float, ...] = (
+    0.5,  # 00:00
+    0.4,  # 01:00
+    0.4,  # 02:00
+    0.4,  # 03:00
+    0.4,  # 04:00
+    0.5,  # 05:00
+    0.8,  # 06:00
+    1.2,  # 07:00
+    1.3,  # 08:00
+    1.0,  # 09:00
+    0.9,  # 10:00
+    0.9,  # 11:00
+    1.1,  # 12:00
+    1.0,  # 13:00
+    0.9,  # 14:00
+    0.9,  # 15:00
+    1.0,  # 16:00
+    1.4,  # 17:00
+    1.6,  # 18:00
+    1.5,  # 19:00
+    1.3,  # 20:00
+    1.1,  # 21:00
+    0.9,  # 22:00
+    0.7,  # 23:00
+)
+
+# Weekend pattern: 10% above the weekday pattern
+_WEEKEND_CONSUMPTION_PATTERN: tuple[float, ...] = tuple(
+    factor * 1.1 for factor in _HOURLY_CONSUMPTION_PATTERN
+)
+
+
 def _normalize_price_value(value: Any) -> float | None:
     """Normalize a raw price value to a float if possible."""
     if isinstance(value, dict):
-        value = value.get("value") or value.get("price")
+        price = value.get("value")
+        value = value.get("price") if price is None else price
 
     try:
         return float(value)
@@ -23,6 +72,28 @@ def _normalize_price_value(value: Any) -> float | None:
         return None
 
 
+def _normalize_price_list(*sources: Sequence[Any]) -> list[float]:
+    """Normalize raw price entries to floats, skipping entries without a price.
+
+    Entries from all sources are concatenated in order.
+    """
+    normalize = _normalize_price_value
+    prices: list[float] = []
+    for entries in sources:
+        if entries and isinstance(entries[0], str):
+            # Some integrations store prices as strings: convert them in one pass,
+            # falling back per entry if any of them is not a number
+            try:
+                prices.extend(list(map(float, entries)))
+                continue
+            except (TypeError, ValueError):
+                pass
+        prices.extend(
+            price for entry in entries if (price := normalize(entry)) is not None
+        )
+    return prices
+
+
 def _detect_interval_from_entries(entries: Any) -> int:
     """Detect the interval in minutes from a list of price entries with timestamps.
 
@@ -49,126 +120,112 @@ def _detect_interval_from_entries(entries: Any) -> int:
     return 60
 
 
-def extract_price_forecast_with_interval(state: State) -> tuple[list[float], int]:
-    """Extract price forecast and detected interval from a Home Assistant price state.
+def _starts_before(entry: Any, now: datetime) -> bool:
+    """Return True if a timestamped price entry starts before now."""
+    if not isinstance(entry, dict):
+        return False
+    start = entry.get("start") or entry.get("from") or entry.get("time")
+    if not isinstance(start, str):
+        return False
+    start_dt = dt_util.parse_datetime(start)
+    return start_dt is not None and dt_util.as_utc(start_dt) < now
 
-    Supports various price sensor formats:
-    - forecast_prices attribute (hourly)
-    - net_prices_today/tomorrow (with interval detection)
-    - raw_today/raw_tomorrow
-    - today/tomorrow
-    - forecast attribute
 
-    Returns:
-        Tuple of (prices list, interval in minutes)
-    """
-    now = dt_util.utcnow()
-
-    # First check for forecast_prices (assumed hourly)
-    forecast_attr = state.attributes.get("forecast_prices")
-    if isinstance(forecast_attr, (list, tuple)):
-        forecast: list[float] = []
-        for entry in forecast_attr:
-            price = _normalize_price_value(entry)
-            if price is not None:
-                forecast.append(price)
-        if forecast:
-            return forecast, 60
-
-    # Check for net_prices_today/tomorrow with interval detection
-    interval_forecast: list[float] = []
+def _parse_net_prices(attributes: Mapping[str, Any], now: datetime) -> PriceForecast:
+    """Parse net_prices_today/tomorrow, skipping entries that already started."""
+    prices: list[float] = []
     detected_interval = 60
-
-    def _extend_interval_forecast(entries: Any, *, skip_past: bool = False) -> bool:
-        nonlocal detected_interval
+    for key, skip_past in (("net_prices_today", True), ("net_prices_tomorrow", False)):
+        entries = attributes.get(key)
         if not isinstance(entries, (list, tuple)):
-            return False
+            continue
 
         # Detect interval from entries with timestamps
         interval = _detect_interval_from_entries(entries)
         if interval != 60:
             detected_interval = interval
 
-        added = False
-        for entry in entries:
-            if skip_past and isinstance(entry, dict):
-                start = entry.get("start") or entry.get("from") or entry.get("time")
-                if isinstance(start, str):
-                    start_dt = dt_util.parse_datetime(start)
-                    if start_dt is not None:
-                        start_dt = dt_util.as_utc(start_dt)
-                        if start_dt < now:
-                            continue
-
-            price = _normalize_price_value(entry)
-            if price is not None:
-                interval_forecast.append(price)
-                added = True
-        return added
-
-    _extend_interval_forecast(state.attributes.get("net_prices_today"), skip_past=True)
-    _extend_interval_forecast(state.attributes.get("net_prices_tomorrow"))
-
-    if interval_forecast:
-        return interval_forecast, detected_interval
-
-    # Fallback to generic forecast
-    generic_forecast = state.attributes.get("forecast")
-    if isinstance(generic_forecast, (list, tuple)):
-        forecast = []
-        for entry in generic_forecast:
-            price = _normalize_price_value(entry)
-            if price is not None:
-                forecast.append(price)
-        if forecast:
-            return forecast, 60
-
-    # Try raw_today/raw_tomorrow
-    hour = now.hour
-    forecast = []
-
-    raw_today = state.attributes.get("raw_today")
-    if isinstance(raw_today, list):
-        for entry in raw_today[hour:]:
-            price = _normalize_price_value(entry)
-            if price is not None:
-                forecast.append(price)
-
-    raw_tomorrow = state.attributes.get("raw_tomorrow")
-    if isinstance(raw_tomorrow, list):
-        for entry in raw_tomorrow:
-            price = _normalize_price_value(entry)
-            if price is not None:
-                forecast.append(price)
-
-    if forecast:
-        return forecast, 60
-
-    # Try today/tomorrow
-    # Skip past hours from today (one entry per hour, starting at midnight)
-    combined: list[Any] = []
-    today_attr = state.attributes.get("today")
-    if isinstance(today_attr, list):
-        combined.extend(today_attr[hour:])
-    tomorrow_attr = state.attributes.get("tomorrow")
-    if isinstance(tomorrow_attr, list):
-        combined.extend(tomorrow_attr)
-
-    for entry in combined:
-        price = _normalize_price_value(entry)
-        if price is not None:
-            forecast.append(price)
-
-    if forecast:
-        return forecast, 60
+        if skip_past:
+            entries = [entry for entry in entries if not _starts_before(entry, now)]
+        prices.extend(_normalize_price_list(entries))
+    return PriceForecast(prices, detected_interval)
+
+
+def _parse_hourly_list(key: str) -> _PriceParser:
+    """Create a parser for a single hourly price list attribute."""
+
+    def _parse(attributes: Mapping[str, Any], _now: datetime) -> PriceForecast:
+        entries = attributes.get(key)
+        if isinstance(entries, (list, tuple)):
+            return PriceForecast(_normalize_price_list(entries), 60)
+        return PriceForecast([], 60)
+
+    return _parse
+
+
+def _parse_hourly_day_lists(today_key: str, tomorrow_key: str) -> _PriceParser:
+    """Create a parser for hourly today/tomorrow lists starting at midnight."""
+
+    def _parse(attributes: Mapping[str, Any], now: datetime) -> PriceForecast:
+        # Skip past hours from today (one entry per hour)
+        today = attributes.get(today_key)
+        tomorrow = attributes.get(tomorrow_key)
+        prices = _normalize_price_list(
+            today[now.hour :] if isinstance(today, list) else (),
+            tomorrow if isinstance(tomorrow, list) else (),
+        )
+        return PriceForecast(prices, 60)
+
+    return _parse
+
+
+# Supported price attribute formats in priority order: the attributes that
+# signal the format and the parser
+_PRICE_FORMATS: tuple[tuple[tuple[str, ...], _PriceParser], ...] = (
+    (("forecast_prices",), _parse_hourly_list("forecast_prices")),
+    (("net_prices_today", "net_prices_tomorrow"), _parse_net_prices),
+    (("forecast",), _parse_hourly_list("forecast")),
+    (
+        ("raw_today", "raw_tomorrow"),
+        _parse_hourly_day_lists("raw_today", "raw_tomorrow"),
+    ),
+    (("today", "tomorrow"), _parse_hourly_day_lists("today", "tomorrow")),
+)
+
+
+def extract_price_forecast_with_interval(state: State) -> PriceForecast:
+    """Extract price forecast and detected interval from a Home Assistant price state.
+
+    Supports various price sensor formats:
+    - forecast_prices attribute (hourly)
+    - net_prices_today/tomorrow (with interval detection)
+    - forecast attribute
+    - raw_today/raw_tomorrow
+    - today/tomorrow
+
+    Returns:
+        PriceForecast of (prices list, interval in minutes)
+    """
+    attributes = state.attributes
+    now: datetime | None = None
+
+    for keys, parse in _PRICE_FORMATS:
+        if not any(key in attributes for key in keys):
+            continue
+        # Only read the clock once a supported format is present
+        if now is None:
+            now = dt_util.utcnow()
+        forecast = parse(attributes, now)
+        if forecast.prices:
+            return forecast
 
     # Last resort: use current state value
     try:
         price = float(state.state)
     except (TypeError, ValueError):
-        return [], 60
+        return PriceForecast([], 60)
 
-    return [price], 60
+    return PriceForecast([price], 60)
 
 
 def extract_price_forecast(state: State) -> list[float]:
@@ -198,37 +255,44 @@ def resample_forecast(
     if not forecast:
         return []
 
-    # Calculate total duration in minutes
+    # Whole-factor upsampling: each target step lies within one source step
+    if source_interval_minutes % target_interval_minutes == 0:
+        factor = source_interval_minutes // target_interval_minutes
+        return [value for value in forecast for _ in range(factor)]
+
+    # Whole-factor downsampling: average full blocks, drop a trailing partial one
+    if target_interval_minutes % source_interval_minutes == 0:
+        factor = target_interval_minutes // source_interval_minutes
+        return [
+            sum(forecast[i : i + factor]) / factor
+            for i in range(0, len(forecast) - factor + 1, factor)
+        ]
+
+    # General case: sweep source and target intervals together and take the
+    # overlap-weighted average of the source values in each target interval
     total_duration = len(forecast) * source_interval_minutes
     target_steps = total_duration // target_interval_minutes
 
     resampled = []
+    j = 0
     for i in range(target_steps):
         target_start = i * target_interval_minutes
-        target_end = (i + 1) * target_interval_minutes
-
-        # Find overlapping source intervals
-        values = []
-        weights = []
+        target_end = target_start + target_interval_minutes
 
-        for j, value in enumerate(forecast):
+        weighted_sum = 0.0
+        while True:
             source_start = j * source_interval_minutes
-            source_end = (j + 1) * source_interval_minutes
-
-            # Calculate overlap
-            overlap_start = max(target_start, source_start)
-            overlap_end = min(target_end, source_end)
-            overlap = max(0, overlap_end - overlap_start)
-
-            if overlap > 0:
-                values.append(value)
-                weights.append(overlap)
-
-        if values:
-            # Weighted average
-            total_weight = sum(weights)
-            weighted_sum = sum(v * w for v, w in zip(values, weights))
-            resampled.append(weighted_sum / total_weight)
+            source_end = source_start + source_interval_minutes
+            overlap = min(target_end, source_end) - max(target_start, source_start)
+            weighted_sum += forecast[j] * overlap
+            if source_end > target_end:
+                # Source step continues into the next target step
+                break
+            j += 1
+            if source_end == target_end:
+                break
+
+        resampled.append(weighted_sum / target_interval_minutes)
 
     return resampled
 
@@ -244,11 +308,10 @@ def safe_float(value: Any, default: float = 0.0) -> float:
         return default
     try:
         result = float(value)
-        if math.isnan(result) or math.isinf(result):
-            return default
-        return result
     except (TypeError, ValueError):
         return default
+    # Rejects NaN and +/-inf in a single check
+    return result if math.isfinite(result) else default
 
 
 def get_sensor_value(
@@ -267,6 +330,25 @@ def get_sensor_value(
     return safe_float(state.state, default)
 
 
+@lru_cache(maxsize=32)
+def _panel_orientation_factor(orientation_deg: float, tilt_deg: float) -> float:
+    """Return the combined orientation and tilt factor for a panel setup.
+
+    Cached because the panel configuration rarely changes between calls.
+    """
+    # Simplified orientation factor (south = 1.0, east/west = 0.65)
+    orientation_factor = 1.0
+    if orientation_deg < 135 or orientation_deg > 225:
+        # Not facing south
+        deviation = min(abs(orientation_deg - 180), abs(orientation_deg - 180 + 360))
+        orientation_factor = max(0.5, 1.0 - deviation / 180)
+
+    # Simplified tilt factor (35 degrees optimal for Netherlands)
+    tilt_factor = 1.0 - abs(tilt_deg - 35) * 0.01
+
+    return orientation_factor * tilt_factor
+
+
 def calculate_pv_forecast(
     solar_radiation_wm2: list[float],
     peak_power_kwp: float,
@@ -298,31 +380,16 @@ def calculate_pv_forecast(
     if peak_power_kwp <= 0:
         return [0.0] * len(solar_radiation_wm2)
 
-    # Simplified orientation factor (south = 1.0, east/west = 0.65)
-    orientation_factor = 1.0
-    if orientation_deg < 135 or orientation_deg > 225:
-        # Not facing south
-        deviation = min(abs(orientation_deg - 180), abs(orientation_deg - 180 + 360))
-        orientation_factor = max(0.5, 1.0 - deviation / 180)
-
-    # Simplified tilt factor (35 degrees optimal for Netherlands)
-    tilt_factor = 1.0 - abs(tilt_deg - 35) * 0.01
-
-    forecast = []
-    for radiation in solar_radiation_wm2:
-        # Power = radiation * peak_power / STC_radiation * factors
-        # STC radiation = 1000 W/m2
-        power_kw = (
-            radiation
-            / 1000
-            * peak_power_kwp
-            * orientation_factor
-            * tilt_factor
-            * efficiency_factor
-        )
-        forecast.append(max(0.0, power_kw))
+    # Power = radiation * peak_power / STC_radiation * factors
+    # STC radiation = 1000 W/m2; everything but the radiation is loop-invariant
+    kw_per_wm2 = (
+        peak_power_kwp
+        * _panel_orientation_factor(orientation_deg, tilt_deg)
+        * efficiency_factor
+        / 1000
+    )
 
-    return forecast
+    return [max(0.0, radiation * kw_per_wm2) for radiation in solar_radiation_wm2]
 
 
 def calculate_consumption_pattern(
@@ -342,35 +409,10 @@ def calculate_consumption_pattern(
     Returns:
         Expected consumption in kW
     """
-    # Hourly pattern (relative to base)
-    hourly_pattern = [
-        0.5,  # 00:00
-        0.4,  # 01:00
-        0.4,  # 02:00
-        0.4,  # 03:00
-        0.4,  # 04:00
-        0.5,  # 05:00
-        0.8,  # 06:00
-        1.2,  # 07:00
-        1.3,  # 08:00
-        1.0,  # 09:00
-        0.9,  # 10:00
-        0.9,  # 11:00
-        1.1,  # 12:00
-        1.0,  # 13:00
-        0.9,  # 14:00
-        0.9,  # 15:00
-        1.0,  # 16:00
-        1.4,  # 17:00
-        1.6,  # 18:00
-        1.5,  # 19:00
-        1.3,  # 20:00
-        1.1,  # 21:00
-        0.9,  # 22:00
-        0.7,  # 23:00
-    ]
-
-    # Weekend factor (slightly different pattern)
-    weekend_factor = 1.1 if day_of_week >= 5 else 1.0
-
-    return base_consumption_kw * hourly_pattern[hour_of_day] * weekend_factor
+    # Weekend has a slightly different pattern
+    pattern = (
+        _WEEKEND_CONSUMPTION_PATTERN
+        if day_of_week >= 5
+        else _HOURLY_CONSUMPTION_PATTERN
+    )
+    return base_consumption_kw * pattern[hour_of_day]
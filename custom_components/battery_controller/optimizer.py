@@ -4,6 +4,7 @@ from __future__ import annotations
 
 import logging
 import math
+from collections.abc import Sequence
 from dataclasses import dataclass
 
 from .battery_model import BatteryConfig
@@ -152,14 +153,14 @@ def calculate_step_cost(
 def optimize_battery_schedule(
     battery_config: BatteryConfig,
     current_soc_kwh: float,
-    price_forecast: list[float],  # EUR/kWh buy prices
-    feed_in_forecast: list[float] | None,  # EUR/kWh sell prices (optional)
-    pv_forecast: list[float],  # kW (AC-side PV)
-    consumption_forecast: list[float],  # kW
+    price_forecast: Sequence[float],  # EUR/kWh buy prices
+    feed_in_forecast: Sequence[float] | None,  # EUR/kWh sell prices (optional)
+    pv_forecast: Sequence[float],  # kW (AC-side PV)
+    consumption_forecast: Sequence[float],  # kW
     time_step_minutes: int = 15,
     degradation_cost_per_kwh: float = 0.03,
     min_price_spread: float = 0.05,
-    pv_dc_forecast: list[float] | None = None,  # kW (DC-coupled PV)
+    pv_dc_forecast: Sequence[float] | None = None,  # kW (DC-coupled PV)
 ) -> OptimizationResult:
     """Optimize battery schedule using dynamic programming.
 
@@ -416,16 +417,16 @@ def _filter_oscillations(
     power_schedule_kw: list[float],
     mode_schedule: list[str],
     soc_schedule_kwh: list[float],
-    price_forecast: list[float],
+    price_forecast: Sequence[float],
     min_price_spread: float,
     degradation_cost_per_kwh: float,
     rte: float,
     time_step_hours: float,
     min_soc_kwh: float,
     max_soc_kwh: float,
-    pv_forecast: list[float] | None = None,
-    consumption_forecast: list[float] | None = None,
-    feed_in_forecast: list[float] | None = None,
+    pv_forecast: Sequence[float] | None = None,
+    consumption_forecast: Sequence[float] | None = None,
+    feed_in_forecast: Sequence[float] | None = None,
 ) -> tuple[list[float], list[str], list[float]]:
     """Filter out unprofitable oscillations from the schedule.
 
@@ -533,7 +534,7 @@ def _filter_oscillations(
     return filtered_power, filtered_mode, filtered_soc
 
 
-def _find_nearest_soc_idx(soc_wh: float, soc_states: list[int]) -> int:
+def _find_nearest_soc_idx(soc_wh: float, soc_states: Sequence[int]) -> int:
     """Find the index of the nearest SoC state.
 
     Uses direct calculation since soc_states is a uniform grid,
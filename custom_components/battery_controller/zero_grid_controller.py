@@ -3,11 +3,19 @@
 from __future__ import annotations
 
 import logging
+from collections.abc import Callable
 from dataclasses import dataclass
 from typing import Any
 
 from .battery_model import BatteryConfig
-from .helpers import clamp
+from .const import (
+    CONF_ZERO_GRID_DEADBAND_W,
+    CONF_ZERO_GRID_PRIORITY,
+    CONF_ZERO_GRID_RESPONSE_TIME_S,
+    DEFAULT_ZERO_GRID_DEADBAND_W,
+    DEFAULT_ZERO_GRID_PRIORITY,
+    DEFAULT_ZERO_GRID_RESPONSE_TIME_S,
+)
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -45,6 +53,12 @@ class ZeroGridController:
         self.battery_config = battery_config
         self._last_target_w = 0.0
         self._setpoint_w = 0.0  # Target grid power (0 = zero-grid)
+        # Precomputed kWh -> % factor for the per-tick soc_percent
+        self._soc_percent_per_kwh = (
+            100.0 / battery_config.capacity_kwh
+            if battery_config.capacity_kwh > 0
+            else 0.0
+        )
 
     def calculate_battery_setpoint(
         self,
@@ -65,139 +79,175 @@ class ZeroGridController:
             Desired battery power in W (positive = charge, negative = discharge)
         """
         if mode == "zero_grid":
-            return self._calculate_zero_grid(current_grid_w, current_soc_kwh)
-        elif mode == "idle":
-            return self._calculate_idle(current_grid_w, current_soc_kwh)
+            # Use previous target rather than actual battery power to avoid
+            # oscillation. Formula: target = last_target - grid_error
+            # This is equivalent to target = -(load - pv) = pv - load, but
+            # remains stable because it does not include the actual battery
+            # power reading (which would cancel itself out each cycle via the
+            # grid meter).
+            target_w = self._last_target_w - current_grid_w
         elif mode == "follow_schedule":
-            return self._calculate_follow_schedule(dp_schedule_w, current_soc_kwh)
+            target_w = dp_schedule_w
         else:
-            # Manual mode - return 0 (no automatic control)
+            # Idle mode preserves battery capacity completely: the optimizer
+            # already accounts for PV and recommends 'charging' on a surplus.
+            # Manual mode has no automatic control.
             return 0.0
 
-    def _calculate_zero_grid(
-        self,
-        current_grid_w: float,
-        current_soc_kwh: float,
-    ) -> float:
-        """Pure zero-grid mode: compensate grid exchange fully.
-
-        Args:
-            current_grid_w: Current grid power in W (positive = import)
-            current_soc_kwh: Current battery SoC in kWh
-
-        Returns:
-            Battery power setpoint in W
-        """
-        # Use previous target rather than actual battery power to avoid oscillation.
-        # Formula: target = last_target - grid_error
-        # This is equivalent to target = -(load - pv) = pv - load, but
-        # remains stable because it does not include the actual battery power
-        # reading (which would cancel itself out each cycle via the grid meter).
-        target_battery_w = self._last_target_w - current_grid_w
-
-        # Apply battery limits
-        target_battery_w = clamp(
-            target_battery_w,
-            -self.config.max_discharge_w,
+        return _apply_limits(
+            target_w,
+            current_soc_kwh,
             self.config.max_charge_w,
+            self.config.max_discharge_w,
+            self.battery_config.min_soc_kwh,
+            self.battery_config.max_soc_kwh,
         )
 
-        # Apply SoC limits
-        target_battery_w = self._apply_soc_limits(target_battery_w, current_soc_kwh)
-
-        return target_battery_w
-
-    def _calculate_idle(
+    def apply_deadband(
         self,
-        current_grid_w: float,
-        current_soc_kwh: float,
+        target_w: float,
     ) -> float:
-        """Idle mode: preserve battery capacity completely.
+        """Apply deadband to prevent oscillation.
 
-        Used when the optimizer wants to preserve battery for upcoming
-        expensive periods. Does nothing - no charge, no discharge.
-        The optimizer already accounts for PV in its planning; if
-        significant PV surplus exists it recommends 'charging' not 'idle'.
+        Only change the setpoint if the difference exceeds the deadband.
+        Compares with the previous target, not current battery power,
+        to avoid oscillation caused by the battery responding to commands.
+
+        Args:
+            target_w: New target power in W
 
         Returns:
-            Battery power setpoint in W (always 0)
+            Adjusted target respecting deadband
         """
-        return 0.0
+        return _apply_deadband(target_w, self._last_target_w, self.config.deadband_w)
 
-    def _calculate_follow_schedule(
+    def _step(
         self,
-        dp_schedule_w: float,
+        current_grid_w: float,
         current_soc_kwh: float,
-    ) -> float:
-        """Follow DP schedule exactly.
+        dp_schedule_w: float,
+        mode: str,
+    ) -> tuple[float, float]:
+        """Calculate the raw and final target for a single control step.
 
-        Args:
-            dp_schedule_w: DP optimizer recommendation in W
-            current_soc_kwh: Current battery SoC in kWh
+        Runs calculate_battery_setpoint with the deadband comparison inlined.
+        Does not update the deadband state.
 
         Returns:
-            Battery power setpoint in W
+            Tuple of (raw target, final target) in W
         """
-        target_battery_w = dp_schedule_w
-
-        # Apply battery limits
-        target_battery_w = clamp(
-            target_battery_w,
-            -self.config.max_discharge_w,
-            self.config.max_charge_w,
+        last_target_w = self._last_target_w
+        target_w = self.calculate_battery_setpoint(
+            current_grid_w, current_soc_kwh, dp_schedule_w, mode
         )
+        if abs(target_w - last_target_w) < self.config.deadband_w:
+            return target_w, last_target_w
+        return target_w, target_w
 
-        # Apply SoC limits
-        target_battery_w = self._apply_soc_limits(target_battery_w, current_soc_kwh)
-
-        return target_battery_w
+    def compile_for_mode(self, mode: str) -> Callable[[float, float, float], float]:
+        """Return a step function specialized for a single control mode.
 
-    def _apply_soc_limits(
-        self,
-        target_w: float,
-        current_soc_kwh: float,
-    ) -> float:
-        """Apply SoC limits to the target power.
+        The mode branch is chosen once, and the limits and deadband are bound
+        as closure locals, so changes to the config or battery config
+        afterwards are not picked up; compile again after a reconfiguration.
+        The deadband state is shared with the controller, so compiled steps
+        and get_control_action can be mixed.
 
         Args:
-            target_w: Desired power in W
-            current_soc_kwh: Current battery SoC in kWh
+            mode: Control mode the returned step function runs in
 
         Returns:
-            Adjusted power respecting SoC limits
+            Function taking (grid W, SoC kWh, DP schedule W) and returning
+            the final battery power setpoint in W
         """
+        max_charge_w = self.config.max_charge_w
+        max_discharge_w = self.config.max_discharge_w
         min_soc_kwh = self.battery_config.min_soc_kwh
         max_soc_kwh = self.battery_config.max_soc_kwh
+        deadband_w = self.config.deadband_w
 
-        if current_soc_kwh <= min_soc_kwh and target_w < 0:
-            # Can't discharge below min SoC
-            return 0.0
+        if mode == "zero_grid":
 
-        if current_soc_kwh >= max_soc_kwh and target_w > 0:
-            # Can't charge above max SoC
-            return 0.0
+            def step(grid_w: float, soc_kwh: float, dp_schedule_w: float) -> float:
+                last_target_w = self._last_target_w
+                target_w = _apply_limits(
+                    last_target_w - grid_w,
+                    soc_kwh,
+                    max_charge_w,
+                    max_discharge_w,
+                    min_soc_kwh,
+                    max_soc_kwh,
+                )
+                if abs(target_w - last_target_w) < deadband_w:
+                    return last_target_w
+                self._last_target_w = target_w
+                return target_w
 
-        return target_w
+        elif mode == "follow_schedule":
 
-    def apply_deadband(
+            def step(grid_w: float, soc_kwh: float, dp_schedule_w: float) -> float:
+                last_target_w = self._last_target_w
+                target_w = _apply_limits(
+                    dp_schedule_w,
+                    soc_kwh,
+                    max_charge_w,
+                    max_discharge_w,
+                    min_soc_kwh,
+                    max_soc_kwh,
+                )
+                if abs(target_w - last_target_w) < deadband_w:
+                    return last_target_w
+                self._last_target_w = target_w
+                return target_w
+
+        else:
+
+            def step(grid_w: float, soc_kwh: float, dp_schedule_w: float) -> float:
+                # The raw target is always 0.0; a previous target within the
+                # deadband of it is held
+                if abs(self._last_target_w) >= deadband_w:
+                    self._last_target_w = 0.0
+                return self._last_target_w
+
+        return step
+
+    def run_batch(
         self,
-        target_w: float,
-    ) -> float:
-        """Apply deadband to prevent oscillation.
+        grid_w: list[float],
+        soc_kwh: list[float],
+        dp_schedule_w: list[float],
+        mode: str,
+    ) -> list[float]:
+        """Run the controller over a series of samples, e.g. for a backtest.
 
-        Only change the setpoint if the difference exceeds the deadband.
-        Compares with the previous target, not current battery power,
-        to avoid oscillation caused by the battery responding to commands.
+        Equivalent to calling get_control_action once per sample, but without
+        building the per-step result dict. The deadband state is carried over
+        between samples and stored on the controller afterwards. Outside
+        zero_grid mode the raw targets don't depend on the previous target,
+        so they are calculated first and apply_deadband_batch scans them.
 
         Args:
-            target_w: New target power in W
+            grid_w: Grid power per sample in W (positive = import)
+            soc_kwh: Battery SoC per sample in kWh
+            dp_schedule_w: DP optimizer recommendation per sample in W
+            mode: Control mode, used for the whole series
 
         Returns:
-            Adjusted target respecting deadband
+            Final battery power setpoint per sample in W
         """
-        if abs(target_w - self._last_target_w) < self.config.deadband_w:
-            return self._last_target_w
-        return target_w
+        if mode == "zero_grid":
+            # The raw target depends on the previous final target
+            step = self.compile_for_mode(mode)
+            return [step(*sample) for sample in zip(grid_w, soc_kwh, dp_schedule_w)]
+
+        raw_targets = [
+            self.calculate_battery_setpoint(grid, soc, dp, mode)
+            for grid, soc, dp in zip(grid_w, soc_kwh, dp_schedule_w)
+        ]
+        final_targets, self._last_target_w = apply_deadband_batch(
+            raw_targets, self._last_target_w, self.config.deadband_w
+        )
+        return final_targets
 
     def get_control_action(
         self,
@@ -219,17 +269,14 @@ class ZeroGridController:
         Returns:
             Dict with control action and metadata
         """
-        # Calculate raw target
-        raw_target_w = self.calculate_battery_setpoint(
+        # Calculate raw target and apply deadband
+        raw_target_w, final_target_w = self._step(
             current_grid_w,
             current_soc_kwh,
             dp_schedule_w,
             mode,
         )
 
-        # Apply deadband
-        final_target_w = self.apply_deadband(raw_target_w)
-
         # Update last target for next deadband calculation
         self._last_target_w = final_target_w
 
@@ -251,10 +298,68 @@ class ZeroGridController:
             "mode": mode,
             "action_mode": action_mode,
             "soc_kwh": current_soc_kwh,
-            "soc_percent": (current_soc_kwh / self.battery_config.capacity_kwh) * 100,
+            "soc_percent": current_soc_kwh * self._soc_percent_per_kwh,
         }
 
 
+def _apply_limits(
+    target_w: float,
+    soc_kwh: float,
+    max_charge_w: float,
+    max_discharge_w: float,
+    min_soc_kwh: float,
+    max_soc_kwh: float,
+) -> float:
+    """Clamp a target to the battery power limits and block it at the SoC limits."""
+    if target_w > 0:
+        if soc_kwh >= max_soc_kwh:
+            # Can't charge above max SoC
+            return 0.0
+        return min(target_w, max_charge_w)
+    if target_w < 0:
+        if soc_kwh <= min_soc_kwh:
+            # Can't discharge below min SoC
+            return 0.0
+        return max(target_w, -max_discharge_w)
+    return target_w
+
+
+def _apply_deadband(
+    target_w: float,
+    last_target_w: float,
+    deadband_w: float,
+) -> float:
+    """Keep the last target unless the new one differs by at least the deadband."""
+    if abs(target_w - last_target_w) < deadband_w:
+        return last_target_w
+    return target_w
+
+
+def apply_deadband_batch(
+    raw_targets: list[float],
+    last_target_w: float,
+    deadband_w: float,
+) -> tuple[list[float], float]:
+    """Apply the deadband to a series of raw targets.
+
+    Batch form of ZeroGridController.apply_deadband: each target is compared
+    with the previous final target, so the state is carried through the series.
+
+    Args:
+        raw_targets: Raw target power per sample in W
+        last_target_w: Target applied before the first sample in W
+        deadband_w: Minimum change in W before the target is updated
+
+    Returns:
+        Tuple of (final target per sample, last applied target)
+    """
+    final_targets = []
+    for target_w in raw_targets:
+        last_target_w = _apply_deadband(target_w, last_target_w, deadband_w)
+        final_targets.append(last_target_w)
+    return final_targets, last_target_w
+
+
 def create_zero_grid_controller(
     config: dict[str, Any],
     battery_config: BatteryConfig,
@@ -268,15 +373,6 @@ def create_zero_grid_controller(
     Returns:
         Configured ZeroGridController
     """
-    from .const import (
-        CONF_ZERO_GRID_DEADBAND_W,
-        CONF_ZERO_GRID_RESPONSE_TIME_S,
-        CONF_ZERO_GRID_PRIORITY,
-        DEFAULT_ZERO_GRID_DEADBAND_W,
-        DEFAULT_ZERO_GRID_RESPONSE_TIME_S,
-        DEFAULT_ZERO_GRID_PRIORITY,
-    )
-
     controller_config = ZeroGridControllerConfig(
         max_charge_w=battery_config.max_charge_power_kw * 1000,
         max_discharge_w=battery_config.max_discharge_power_kw * 1000,
@@ -4,9 +4,60 @@ from __future__ import annotations
 
 import pytest
 
+from custom_components.battery_controller.battery_model import BatteryConfig
 
-# Enable loading of custom integrations for all tests
+
+def pytest_addoption(parser):
+    """Add the --runslow option for long-horizon optimizer variants."""
+    parser.addoption(
+        "--runslow", action="store_true", default=False, help="run slow tests"
+    )
+
+
+def pytest_collection_modifyitems(config, items):
+    """Skip tests marked slow unless --runslow is given."""
+    if config.getoption("--runslow"):
+        return
+    skip_slow = pytest.mark.skip(reason="needs --runslow")
+    for item in items:
+        if "slow" in item.keywords:
+            item.add_marker(skip_slow)
+
+
+# Enable loading of custom integrations for tests that set up Home Assistant.
+# Pure-math tests don't request hass, so they skip the HA bootstrap entirely.
 @pytest.fixture(autouse=True)
-def auto_enable_custom_integrations(enable_custom_integrations):
+def auto_enable_custom_integrations(request):
     """Automatically enable custom integration."""
-    return enable_custom_integrations
+    if "hass" in request.fixturenames:
+        request.getfixturevalue("enable_custom_integrations")
+
+
+# Battery configs are read-only value objects, shared by all tests
+@pytest.fixture(scope="session")
+def battery_config():
+    """Standard 10 kWh battery."""
+    return BatteryConfig(
+        capacity_kwh=10.0,
+        max_charge_power_kw=5.0,
+        max_discharge_power_kw=5.0,
+        round_trip_efficiency=0.90,
+        min_soc_percent=10.0,
+        max_soc_percent=90.0,
+    )
+
+
+@pytest.fixture(scope="session")
+def dc_battery_config():
+    """Battery with DC-coupled PV."""
+    return BatteryConfig(
+        capacity_kwh=10.0,
+        max_charge_power_kw=5.0,
+        max_discharge_power_kw=5.0,
+        round_trip_efficiency=0.90,
+        min_soc_percent=10.0,
+        max_soc_percent=90.0,
+        pv_dc_coupled=True,
+        pv_dc_peak_power_kwp=3.0,
+        pv_dc_efficiency=0.97,
+    )
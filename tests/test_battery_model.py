@@ -14,6 +14,8 @@ from custom_components.battery_controller.battery_model import (
     calculate_degradation_cost_per_kwh,
 )
 
+pytestmark = pytest.mark.unit
+
 
 class TestBatteryConfig:
     """Tests for BatteryConfig dataclass."""
@@ -1,7 +1,9 @@
 """Tests for helpers.py."""
 
+from types import SimpleNamespace
+
+from homeassistant.util import dt as dt_util
 import pytest
-from unittest.mock import MagicMock
 
 from custom_components.battery_controller.helpers import (
     clamp,
@@ -12,6 +14,34 @@ from custom_components.battery_controller.helpers import (
     extract_price_forecast_with_interval,
 )
 
+pytestmark = pytest.mark.unit
+
+
+# 24 hourly raw_today entries from 0.10 to 0.33, shared read-only by tests
+_RAW_TODAY = tuple({"value": round(0.10 + i * 0.01, 2)} for i in range(24))
+
+
+@pytest.fixture
+def freeze_utcnow(monkeypatch):
+    """Return a helper that fixes dt_util.utcnow() at the given time today."""
+
+    def _freeze(hour: int, minute: int = 0):
+        fake_now = dt_util.utcnow().replace(
+            hour=hour, minute=minute, second=0, microsecond=0
+        )
+        monkeypatch.setattr(dt_util, "utcnow", lambda: fake_now)
+        return fake_now
+
+    return _freeze
+
+
+@pytest.fixture(scope="module")
+def float_forecast_state():
+    """Price state with a plain float forecast_prices attribute (read-only)."""
+    return SimpleNamespace(
+        state="0.25", attributes={"forecast_prices": [0.10, 0.15, 0.20, 0.25]}
+    )
+
 
 class TestClamp:
     """Tests for clamp function."""
@@ -67,33 +97,27 @@ class TestResampleForecast:
         data = [1.0, 2.0, 3.0]
         assert resample_forecast(data, 60, 60) == data
 
-    def test_hourly_to_15min(self):
-        data = [1.0, 2.0]
-        result = resample_forecast(data, 60, 15)
-        # 2 hours -> 8 x 15-min steps
-        assert len(result) == 8
-        # First 4 should be ~1.0, last 4 should be ~2.0
-        assert all(v == pytest.approx(1.0) for v in result[:4])
-        assert all(v == pytest.approx(2.0) for v in result[4:])
-
-    def test_15min_to_hourly(self):
-        data = [1.0, 2.0, 3.0, 4.0]  # 4 x 15-min = 1 hour
-        result = resample_forecast(data, 15, 60)
-        assert len(result) == 1
-        # Weighted average = (1+2+3+4)/4 = 2.5
-        assert result[0] == pytest.approx(2.5)
-
     def test_empty_input(self):
         assert resample_forecast([], 60, 15) == []
 
-    def test_30min_to_15min(self):
-        data = [10.0, 20.0]  # 2 x 30-min = 60 min
-        result = resample_forecast(data, 30, 15)
-        assert len(result) == 4
-        assert result[0] == pytest.approx(10.0)
-        assert result[1] == pytest.approx(10.0)
-        assert result[2] == pytest.approx(20.0)
-        assert result[3] == pytest.approx(20.0)
+    @pytest.mark.parametrize(
+        ("data", "source", "target", "expected"),
+        [
+            # 2 hours -> 8 x 15-min steps
+            ([1.0, 2.0], 60, 15, [1.0] * 4 + [2.0] * 4),
+            # 4 x 15-min = 1 hour, average = (1+2+3+4)/4
+            ([1.0, 2.0, 3.0, 4.0], 15, 60, [2.5]),
+            # 2 x 30-min = 60 min
+            ([10.0, 20.0], 30, 15, [10.0, 10.0, 20.0, 20.0]),
+            # 75 min -> one full hour, trailing partial hour dropped
+            ([1.0, 2.0, 3.0, 4.0, 5.0], 15, 60, [2.5]),
+            # 180 min -> 4 x 45-min, overlap-weighted averages
+            ([1.0, 2.0, 3.0], 60, 45, [1.0, 75 / 45, 105 / 45, 3.0]),
+        ],
+        ids=["60_to_15", "15_to_60", "30_to_15", "partial_block", "60_to_45"],
+    )
+    def test_resample(self, data, source, target, expected):
+        assert resample_forecast(data, source, target) == pytest.approx(expected)
 
 
 class TestCalculatePvForecast:
@@ -155,20 +179,19 @@ class TestExtractPriceForecast:
     """Tests for extract_price_forecast_with_interval function."""
 
     def _make_state(self, state_value="0.25", attributes=None):
-        """Create a mock HA State object."""
-        state = MagicMock()
-        state.state = state_value
-        state.attributes = attributes or {}
-        return state
+        """Create a lightweight stand-in for a HA State object."""
+        return SimpleNamespace(state=state_value, attributes=attributes or {})
 
-    def test_forecast_prices_attribute(self):
-        state = self._make_state(
-            attributes={"forecast_prices": [0.10, 0.15, 0.20, 0.25]}
-        )
-        prices, interval = extract_price_forecast_with_interval(state)
+    def test_forecast_prices_attribute(self, float_forecast_state):
+        prices, interval = extract_price_forecast_with_interval(float_forecast_state)
         assert prices == [0.10, 0.15, 0.20, 0.25]
         assert interval == 60
 
+    def test_result_fields(self, float_forecast_state):
+        forecast = extract_price_forecast_with_interval(float_forecast_state)
+        assert forecast.prices == [0.10, 0.15, 0.20, 0.25]
+        assert forecast.interval == 60
+
     def test_forecast_prices_with_dicts(self):
         state = self._make_state(
             attributes={
@@ -182,35 +205,38 @@ class TestExtractPriceForecast:
         prices, interval = extract_price_forecast_with_interval(state)
         assert prices == [0.10, 0.15, 0.20]
 
+    def test_forecast_prices_keeps_zero_value(self):
+        state = self._make_state(
+            attributes={"forecast_prices": [{"value": 0.0}, {"value": -0.05}]}
+        )
+        prices, _ = extract_price_forecast_with_interval(state)
+        assert prices == [0.0, -0.05]
+
+    def test_forecast_prices_none_value_falls_back_to_price(self):
+        state = self._make_state(
+            attributes={
+                "forecast_prices": [{"value": 0.10}, {"value": None, "price": 0.20}]
+            }
+        )
+        prices, _ = extract_price_forecast_with_interval(state)
+        assert prices == [0.10, 0.20]
+
+    def test_forecast_prices_as_strings(self):
+        state = self._make_state(attributes={"forecast_prices": ["0.10", "0.15"]})
+        prices, _ = extract_price_forecast_with_interval(state)
+        assert prices == [0.10, 0.15]
+
+    def test_forecast_prices_skips_malformed_strings(self):
+        state = self._make_state(
+            attributes={"forecast_prices": ["0.10", "n/a", "0.20"]}
+        )
+        prices, _ = extract_price_forecast_with_interval(state)
+        assert prices == [0.10, 0.20]
+
     def test_raw_today_tomorrow(self):
         state = self._make_state(
             attributes={
-                "raw_today": [
-                    {"value": 0.10},
-                    {"value": 0.11},
-                    {"value": 0.12},
-                    {"value": 0.13},
-                    {"value": 0.14},
-                    {"value": 0.15},
-                    {"value": 0.16},
-                    {"value": 0.17},
-                    {"value": 0.18},
-                    {"value": 0.19},
-                    {"value": 0.20},
-                    {"value": 0.21},
-                    {"value": 0.22},
-                    {"value": 0.23},
-                    {"value": 0.24},
-                    {"value": 0.25},
-                    {"value": 0.26},
-                    {"value": 0.27},
-                    {"value": 0.28},
-                    {"value": 0.29},
-                    {"value": 0.30},
-                    {"value": 0.31},
-                    {"value": 0.32},
-                    {"value": 0.33},
-                ],
+                "raw_today": list(_RAW_TODAY),
                 "raw_tomorrow": [
                     {"value": 0.05},
                     {"value": 0.06},
@@ -221,55 +247,43 @@ class TestExtractPriceForecast:
         assert len(prices) > 0
         assert interval == 60
 
-    def test_current_state_fallback(self):
-        state = self._make_state(state_value="0.25", attributes={})
+    @pytest.mark.parametrize(
+        ("state_value", "expected"),
+        [
+            ("0.25", [0.25]),  # Current state used as a single price
+            ("unknown", []),  # Invalid state gives no prices
+        ],
+    )
+    def test_current_state_fallback(self, state_value, expected):
+        state = self._make_state(state_value=state_value, attributes={})
         prices, interval = extract_price_forecast_with_interval(state)
-        assert prices == [0.25]
+        assert prices == expected
         assert interval == 60
 
-    def test_invalid_state_empty(self):
-        state = self._make_state(state_value="unknown", attributes={})
-        prices, interval = extract_price_forecast_with_interval(state)
-        assert prices == []
-
-    def test_today_skips_past_hours(self):
+    def test_today_skips_past_hours(self, freeze_utcnow):
         """today attribute must not include already-elapsed hours."""
-        from unittest.mock import patch
-        from homeassistant.util import dt as dt_util
-
         # 24 hourly prices for a full day
         today_prices = [float(i) * 0.01 for i in range(24)]
         state = self._make_state(attributes={"today": today_prices})
 
-        # Simulate that it is currently 10:00
-        fake_now = dt_util.utcnow().replace(hour=10, minute=5, second=0, microsecond=0)
-        with patch(
-            "custom_components.battery_controller.helpers.dt_util.utcnow",
-            return_value=fake_now,
-        ):
-            prices, interval = extract_price_forecast_with_interval(state)
+        # Simulate that it is currently 10:05
+        freeze_utcnow(hour=10, minute=5)
+        prices, interval = extract_price_forecast_with_interval(state)
 
         # Prices from hour 10 onwards (index 10..23 = 14 entries)
         assert prices == today_prices[10:]
         assert interval == 60
 
-    def test_today_and_tomorrow_combined(self):
+    def test_today_and_tomorrow_combined(self, freeze_utcnow):
         """today[hour:] + tomorrow should be combined correctly."""
-        from unittest.mock import patch
-        from homeassistant.util import dt as dt_util
-
         today_prices = [float(i) for i in range(24)]
         tomorrow_prices = [float(i + 24) for i in range(24)]
         state = self._make_state(
             attributes={"today": today_prices, "tomorrow": tomorrow_prices}
         )
 
-        fake_now = dt_util.utcnow().replace(hour=20, minute=0, second=0, microsecond=0)
-        with patch(
-            "custom_components.battery_controller.helpers.dt_util.utcnow",
-            return_value=fake_now,
-        ):
-            prices, interval = extract_price_forecast_with_interval(state)
+        freeze_utcnow(hour=20)
+        prices, interval = extract_price_forecast_with_interval(state)
 
         expected = today_prices[20:] + tomorrow_prices
         assert prices == expected
@@ -12,113 +12,92 @@ from custom_components.battery_controller.optimizer import (
     _find_nearest_soc_idx,
 )
 
-
-@pytest.fixture
-def battery_config():
-    """Standard 10 kWh battery."""
-    return BatteryConfig(
-        capacity_kwh=10.0,
-        max_charge_power_kw=5.0,
-        max_discharge_power_kw=5.0,
-        round_trip_efficiency=0.90,
-        min_soc_percent=10.0,
-        max_soc_percent=90.0,
-    )
-
-
-@pytest.fixture
-def dc_battery_config():
-    """Battery with DC-coupled PV."""
-    return BatteryConfig(
-        capacity_kwh=10.0,
-        max_charge_power_kw=5.0,
-        max_discharge_power_kw=5.0,
-        round_trip_efficiency=0.90,
-        min_soc_percent=10.0,
-        max_soc_percent=90.0,
-        pv_dc_coupled=True,
-        pv_dc_peak_power_kwp=3.0,
-        pv_dc_efficiency=0.97,
-    )
-
-
-class TestCalculateStepCost:
-    """Tests for calculate_step_cost function."""
-
-    def test_idle_no_pv(self, battery_config):
-        """Idle battery, just consumption from grid."""
-        cost = calculate_step_cost(
-            time_step_hours=0.25,
-            soc_wh=5000,
-            action_w=0,
-            grid_price=0.30,
-            feed_in_price=0.07,
-            pv_production_w=0,
-            consumption_w=1000,
-            rte=0.90,
-            degradation_cost_per_kwh=0.03,
-            battery_config=battery_config,
-        )
+pytestmark = pytest.mark.unit
+
+
+# Fixed inputs shared across tests; tuples so no test can mutate them
+ZERO_PV_4 = (0.0,) * 4
+ZERO_PV_8 = (0.0,) * 8
+FLAT_CONSUMPTION_4 = (0.5,) * 4
+FLAT_CONSUMPTION_8 = (0.5,) * 8
+STATES_5 = (1000, 2000, 3000, 4000, 5000)
+
+# Inputs shared by the calculate_step_cost cases; each case overrides a few
+_STEP_DEFAULTS = {
+    "time_step_hours": 0.25,
+    "soc_wh": 5000,
+    "action_w": 0,
+    "grid_price": 0.30,
+    "feed_in_price": 0.07,
+    "pv_production_w": 0,
+    "consumption_w": 1000,
+    "rte": 0.90,
+    "degradation_cost_per_kwh": 0.03,
+}
+
+# (config fixture, overrides, predicate on the resulting cost)
+STEP_COST_CASES = [
+    pytest.param(
+        # Idle battery, just consumption from grid.
         # 1000W * 0.25h = 250 Wh = 0.25 kWh * 0.30 = 0.075 EUR
-        assert cost == pytest.approx(0.075, abs=0.001)
-
-    def test_idle_with_pv_surplus(self, battery_config):
-        """Idle battery, PV surplus exported."""
-        cost = calculate_step_cost(
-            time_step_hours=0.25,
-            soc_wh=5000,
-            action_w=0,
-            grid_price=0.30,
-            feed_in_price=0.07,
-            pv_production_w=3000,
-            consumption_w=1000,
-            rte=0.90,
-            degradation_cost_per_kwh=0.03,
-            battery_config=battery_config,
-        )
+        "battery_config",
+        {},
+        lambda cost: cost == pytest.approx(0.075, abs=0.001),
+        id="idle_no_pv",
+    ),
+    pytest.param(
+        # Idle battery, PV surplus exported.
         # Net grid = 1000 - 3000 = -2000W (exporting)
         # 2000W * 0.25h = 500 Wh = 0.5 kWh * 0.07 = 0.035 EUR revenue
-        assert cost == pytest.approx(-0.035, abs=0.001)
-
-    def test_charging_from_grid(self, battery_config):
-        """Charging battery from grid, no PV."""
-        cost = calculate_step_cost(
-            time_step_hours=0.25,
-            soc_wh=5000,
-            action_w=2000,  # Charge at 2kW
-            grid_price=0.10,
-            feed_in_price=0.07,
-            pv_production_w=0,
-            consumption_w=500,
-            rte=0.90,
-            degradation_cost_per_kwh=0.03,
-            battery_config=battery_config,
-        )
+        "battery_config",
+        {"pv_production_w": 3000},
+        lambda cost: cost == pytest.approx(-0.035, abs=0.001),
+        id="idle_with_pv_surplus",
+    ),
+    pytest.param(
+        # Charging battery at 2kW from grid, no PV.
         # Grid to battery = 2000 / sqrt(0.90) = ~2108W
         # Net grid = 500 + 2108 = 2608W
         # Grid cost = 2608 * 0.25 / 1000 * 0.10 = 0.0652
         # Degradation = 2000 * 0.25 / 1000 * 0.03 = 0.015
-        assert cost > 0.07  # Grid + degradation
+        "battery_config",
+        {"action_w": 2000, "grid_price": 0.10, "consumption_w": 500},
+        lambda cost: cost > 0.07,  # Grid + degradation
+        id="charging_from_grid",
+    ),
+    pytest.param(
+        # Discharging battery at 2kW to cover consumption.
+        # Battery provides usable_power = 2000 * sqrt(0.90) = ~1897W
+        # Net grid = 2000 - 0 + (-1897) = 103W (still small import)
+        # Should be much cheaper than buying full 2000W from grid (0.15 EUR)
+        "battery_config",
+        {"action_w": -2000, "consumption_w": 2000},
+        lambda cost: cost < 2000 * 0.25 / 1000 * 0.30,
+        id="discharging_to_home",
+    ),
+    pytest.param(
+        # Excess DC PV goes to AC side through inverter, battery idle.
+        # DC PV excess: 3000W * 0.96 = 2880W to AC
+        # Net grid = 1000 - 2880 = -1880W (exporting)
+        # Revenue = 1880 * 0.25 / 1000 * 0.07 = 0.0329
+        "dc_battery_config",
+        {"pv_dc_production_w": 3000},
+        lambda cost: cost < 0,  # Revenue from export
+        id="dc_pv_excess_to_ac",
+    ),
+]
+
+
+class TestCalculateStepCost:
+    """Tests for calculate_step_cost function."""
 
-    def test_discharging_to_home(self, battery_config):
-        """Discharging battery to cover consumption."""
+    @pytest.mark.parametrize(("config", "overrides", "predicate"), STEP_COST_CASES)
+    def test_step_cost(self, request, config, overrides, predicate):
         cost = calculate_step_cost(
-            time_step_hours=0.25,
-            soc_wh=5000,
-            action_w=-2000,  # Discharge at 2kW
-            grid_price=0.30,
-            feed_in_price=0.07,
-            pv_production_w=0,
-            consumption_w=2000,
-            rte=0.90,
-            degradation_cost_per_kwh=0.03,
-            battery_config=battery_config,
+            **{**_STEP_DEFAULTS, **overrides},
+            battery_config=request.getfixturevalue(config),
         )
-        # Battery provides usable_power = 2000 * sqrt(0.90) = ~1897W
-        # Net grid = 2000 - 0 + (-1897) = 103W (still small import)
-        # Should be much cheaper than buying full 2000W from grid
-        no_battery_cost = 2000 * 0.25 / 1000 * 0.30  # = 0.15
-        assert cost < no_battery_cost
+        assert predicate(cost)
 
     def test_degradation_cost_added(self, battery_config):
         """Degradation cost is added to total."""
@@ -180,25 +159,82 @@ class TestCalculateStepCost:
         # DC PV charging is "free" (no grid cost), so cost_dc should be lower
         assert cost_dc <= cost_ac
 
-    def test_dc_pv_excess_to_ac(self, dc_battery_config):
-        """Excess DC PV goes to AC side through inverter."""
-        cost = calculate_step_cost(
-            time_step_hours=0.25,
-            soc_wh=5000,
-            action_w=0,
-            grid_price=0.30,
-            feed_in_price=0.07,
-            pv_production_w=0,
-            consumption_w=1000,
-            rte=0.90,
-            degradation_cost_per_kwh=0.03,
-            battery_config=dc_battery_config,
-            pv_dc_production_w=3000,  # 3kW DC PV, battery idle
-        )
-        # DC PV excess: 3000W * 0.96 = 2880W to AC
-        # Net grid = 1000 - 2880 = -1880W (exporting)
-        # Revenue = 1880 * 0.25 / 1000 * 0.07 = 0.0329
-        assert cost < 0  # Revenue from export
+
+# Optimizer inputs covering all three modes (SoC 1.0 kWh is the fixture min SoC)
+MODE_SCENARIOS = [
+    pytest.param(
+        # Very low price then high for charging
+        {
+            "prices": [0.01, 0.45, 0.45, 0.45, 0.45, 0.45],
+            "soc": 4.0,
+            "degradation": 0.003,
+            "min_spread": 0.0,
+        },
+        id="charge",
+    ),
+    pytest.param(
+        # High price then low for discharging
+        {
+            "prices": [0.45, 0.01, 0.01, 0.01, 0.01, 0.01],
+            "soc": 7.0,
+            "degradation": 0.003,
+            "min_spread": 0.0,
+        },
+        id="discharge",
+    ),
+    pytest.param(
+        # Flat prices at min SoC for idle mode
+        {
+            "prices": [0.20] * 4,
+            "soc": 1.0,
+            "degradation": 0.05,
+            "min_spread": 0.0,
+        },
+        id="flat_min",
+    ),
+]
+
+# (SoC kWh, prices, degradation, predicate one scheduled power must satisfy)
+MODE_TYPE_CASES = [
+    pytest.param(
+        # Very low price followed by very high -> should charge
+        5.0,
+        [0.02, 0.40, 0.40, 0.40, 0.40, 0.40],
+        0.005,
+        lambda p: p > 0.1,
+        id="charging",
+    ),
+    pytest.param(
+        # Flat prices, start at min SoC, high degradation -> should stay idle
+        1.0,
+        [0.20] * 4,
+        0.05,
+        lambda p: abs(p) < 0.01,
+        id="idle",
+    ),
+    pytest.param(
+        # Very high price followed by low, good SoC -> should discharge
+        7.0,
+        [0.40, 0.02, 0.02, 0.02, 0.02, 0.02],
+        0.005,
+        lambda p: p < -0.1,
+        id="discharging",
+    ),
+]
+
+
+@pytest.fixture(scope="module")
+def low_high_result(battery_config):
+    """Result for four cheap then four expensive steps, shared between tests."""
+    return optimize_battery_schedule(
+        battery_config=battery_config,
+        current_soc_kwh=5.0,
+        price_forecast=[0.05] * 4 + [0.30] * 4,
+        feed_in_forecast=None,
+        pv_forecast=ZERO_PV_8,
+        consumption_forecast=FLAT_CONSUMPTION_8,
+        time_step_minutes=15,
+    )
 
 
 class TestOptimizeBatterySchedule:
@@ -208,8 +244,8 @@ class TestOptimizeBatterySchedule:
         """Basic optimization with price spread."""
         # Low price then high price -> should charge then discharge
         prices = [0.05, 0.05, 0.30, 0.30]  # EUR/kWh per 15-min step
-        pv = [0.0] * 4
-        consumption = [0.5] * 4
+        pv = ZERO_PV_4
+        consumption = FLAT_CONSUMPTION_4
 
         result = optimize_battery_schedule(
             battery_config=battery_config,
@@ -228,32 +264,16 @@ class TestOptimizeBatterySchedule:
         assert len(result.mode_schedule) == 4
         assert len(result.soc_schedule_kwh) == 5  # n+1
 
-    def test_savings_positive_with_price_spread(self, battery_config):
+    def test_savings_positive_with_price_spread(self, low_high_result):
         """Optimizer should find savings when price spread exists."""
-        # Alternating low/high prices
-        n = 8
-        prices = [0.05, 0.05, 0.05, 0.05, 0.30, 0.30, 0.30, 0.30]
-        pv = [0.0] * n
-        consumption = [0.5] * n
-
-        result = optimize_battery_schedule(
-            battery_config=battery_config,
-            current_soc_kwh=5.0,
-            price_forecast=prices,
-            feed_in_forecast=None,
-            pv_forecast=pv,
-            consumption_forecast=consumption,
-            time_step_minutes=15,
-        )
-
         # With such a large price spread, optimizer should find savings
-        assert result.savings >= 0
+        assert low_high_result.savings >= 0
 
     def test_flat_prices_no_arbitrage(self, battery_config):
         """With flat prices and min SoC, cycling adds cost (no arbitrage)."""
         prices = [0.20] * 8
-        pv = [0.0] * 8
-        consumption = [0.5] * 8
+        pv = ZERO_PV_8
+        consumption = FLAT_CONSUMPTION_8
 
         result = optimize_battery_schedule(
             battery_config=battery_config,
@@ -285,8 +305,8 @@ class TestOptimizeBatterySchedule:
         # profitable (efficiency losses + degradation always outweigh the spread)
         prices = [0.07] * 8
         feed_in = [0.07] * 8
-        pv = [0.0] * 8
-        consumption = [0.5] * 8
+        pv = ZERO_PV_8
+        consumption = FLAT_CONSUMPTION_8
         # Start well above min_soc so there IS pre-existing terminal value
         mid_soc = (battery_config.min_soc_kwh + battery_config.max_soc_kwh) / 2.0
 
@@ -304,27 +324,12 @@ class TestOptimizeBatterySchedule:
         # Battery idle throughout → savings must be 0, not a positive phantom value
         assert result.savings == pytest.approx(0.0, abs=0.01)
 
-    def test_soc_stays_in_bounds(self, battery_config):
+    def test_soc_stays_in_bounds(self, battery_config, low_high_result):
         """SoC should never exceed configured bounds."""
-        prices = [0.05] * 4 + [0.30] * 4
-        pv = [0.0] * 8
-        consumption = [0.5] * 8
-
-        result = optimize_battery_schedule(
-            battery_config=battery_config,
-            current_soc_kwh=5.0,
-            price_forecast=prices,
-            feed_in_forecast=None,
-            pv_forecast=pv,
-            consumption_forecast=consumption,
-            time_step_minutes=15,
-        )
-
-        for soc in result.soc_schedule_kwh:
-            assert (
-                soc >= battery_config.min_soc_kwh - 0.1
-            )  # Small tolerance for discretization
-            assert soc <= battery_config.max_soc_kwh + 0.1
+        soc = low_high_result.soc_schedule_kwh
+        # Small tolerance for discretization
+        assert min(soc) >= battery_config.min_soc_kwh - 0.1
+        assert max(soc) <= battery_config.max_soc_kwh + 0.1
 
     def test_empty_forecast_returns_empty(self, battery_config):
         """Empty input should return empty result."""
@@ -341,116 +346,57 @@ class TestOptimizeBatterySchedule:
         assert result.optimal_mode == "idle"
         assert result.savings == 0.0
 
-    def test_mode_schedule_consistency(self, battery_config):
+    @pytest.mark.parametrize("scenario", MODE_SCENARIOS)
+    def test_mode_schedule_consistency(self, battery_config, scenario):
         """Mode schedule should match power schedule."""
-        # Test multiple scenarios to ensure all mode types are covered
-        scenarios = [
-            # Scenario 1: Very low price then high for charging
-            {
-                "prices": [0.01, 0.45, 0.45, 0.45, 0.45, 0.45],
-                "soc": 4.0,
-                "degradation": 0.003,
-                "min_spread": 0.0,
-            },
-            # Scenario 2: High price then low for discharging
-            {
-                "prices": [0.45, 0.01, 0.01, 0.01, 0.01, 0.01],
-                "soc": 7.0,
-                "degradation": 0.003,
-                "min_spread": 0.0,
-            },
-            # Scenario 3: Flat prices at min SoC for idle mode
-            {
-                "prices": [0.20] * 4,
-                "soc": battery_config.min_soc_kwh,
-                "degradation": 0.05,
-                "min_spread": 0.0,
-            },
-        ]
-
-        for scenario in scenarios:
-            result = optimize_battery_schedule(
-                battery_config=battery_config,
-                current_soc_kwh=scenario["soc"],
-                price_forecast=scenario["prices"],
-                feed_in_forecast=None,
-                pv_forecast=[0.0] * len(scenario["prices"]),
-                consumption_forecast=[0.5] * len(scenario["prices"]),
-                time_step_minutes=15,
-                degradation_cost_per_kwh=scenario["degradation"],
-                min_price_spread=scenario["min_spread"],
-            )
-
-            # Check mode consistency with power
-            for power, mode in zip(result.power_schedule_kw, result.mode_schedule):
-                if power > 0.01:
-                    assert mode == "charging"
-                elif power < -0.01:
-                    assert mode == "discharging"
-                else:
-                    assert mode == "idle"
-
-    def test_mode_schedule_all_types(self, battery_config):
-        """Explicitly test all three mode types: charging, idle, discharging."""
-        # Scenario 1: Very low price followed by very high -> should charge
-        result_charge = optimize_battery_schedule(
+        result = optimize_battery_schedule(
             battery_config=battery_config,
-            current_soc_kwh=5.0,
-            price_forecast=[0.02, 0.40, 0.40, 0.40, 0.40, 0.40],
+            current_soc_kwh=scenario["soc"],
+            price_forecast=scenario["prices"],
             feed_in_forecast=None,
-            pv_forecast=[0.0] * 6,
-            consumption_forecast=[0.5] * 6,
+            pv_forecast=[0.0] * len(scenario["prices"]),
+            consumption_forecast=[0.5] * len(scenario["prices"]),
             time_step_minutes=15,
-            degradation_cost_per_kwh=0.005,
-            min_price_spread=0.0,  # Disable min spread check
-        )
-        # Should charge during low price
-        has_charging = any(p > 0.1 for p in result_charge.power_schedule_kw)
-        assert has_charging, (
-            f"Should have charging mode. Schedule: {result_charge.power_schedule_kw}"
+            degradation_cost_per_kwh=scenario["degradation"],
+            min_price_spread=scenario["min_spread"],
         )
 
-        # Scenario 2: Flat prices, start at min SoC -> should stay idle
-        result_idle = optimize_battery_schedule(
-            battery_config=battery_config,
-            current_soc_kwh=battery_config.min_soc_kwh,
-            price_forecast=[0.20] * 4,
-            feed_in_forecast=None,
-            pv_forecast=[0.0] * 4,
-            consumption_forecast=[0.5] * 4,
-            time_step_minutes=15,
-            degradation_cost_per_kwh=0.05,  # High degradation discourages cycling
-            min_price_spread=0.0,
-        )
-        # Should stay idle (no arbitrage opportunity)
-        has_idle = any(abs(p) < 0.01 for p in result_idle.power_schedule_kw)
-        assert has_idle, (
-            f"Should have idle mode. Schedule: {result_idle.power_schedule_kw}"
-        )
+        # Check mode consistency with power
+        for power, mode in zip(result.power_schedule_kw, result.mode_schedule):
+            if power > 0.01:
+                assert mode == "charging"
+            elif power < -0.01:
+                assert mode == "discharging"
+            else:
+                assert mode == "idle"
 
-        # Scenario 3: Very high price followed by low -> should discharge
-        result_discharge = optimize_battery_schedule(
+    @pytest.mark.parametrize(
+        ("soc", "prices", "degradation", "has_mode"), MODE_TYPE_CASES
+    )
+    def test_mode_schedule_all_types(
+        self, battery_config, soc, prices, degradation, has_mode
+    ):
+        """Explicitly test all three mode types: charging, idle, discharging."""
+        result = optimize_battery_schedule(
             battery_config=battery_config,
-            current_soc_kwh=7.0,  # Start with good SoC
-            price_forecast=[0.40, 0.02, 0.02, 0.02, 0.02, 0.02],
+            current_soc_kwh=soc,
+            price_forecast=prices,
             feed_in_forecast=None,
-            pv_forecast=[0.0] * 6,
-            consumption_forecast=[0.5] * 6,
+            pv_forecast=[0.0] * len(prices),
+            consumption_forecast=[0.5] * len(prices),
             time_step_minutes=15,
-            degradation_cost_per_kwh=0.005,
-            min_price_spread=0.0,
+            degradation_cost_per_kwh=degradation,
+            min_price_spread=0.0,  # Disable min spread check
         )
-        # Should discharge during high price
-        has_discharging = any(p < -0.1 for p in result_discharge.power_schedule_kw)
-        assert has_discharging, (
-            f"Should have discharging mode. Schedule: {result_discharge.power_schedule_kw}"
+        assert any(has_mode(p) for p in result.power_schedule_kw), (
+            f"Expected mode missing. Schedule: {result.power_schedule_kw}"
         )
 
     def test_dc_pv_forecast_used(self, dc_battery_config):
         """DC PV forecast should be accepted and used."""
         prices = [0.30] * 4
-        pv = [0.0] * 4
-        consumption = [0.5] * 4
+        pv = ZERO_PV_4
+        consumption = FLAT_CONSUMPTION_4
         pv_dc = [2.0, 2.0, 0.0, 0.0]  # 2kW DC PV first 2 steps
 
         result = optimize_battery_schedule(
@@ -471,7 +417,7 @@ class TestOptimizeBatterySchedule:
         """Different feed-in price should affect optimization."""
         prices = [0.30] * 4
         pv = [3.0] * 4  # PV surplus
-        consumption = [0.5] * 4
+        consumption = FLAT_CONSUMPTION_4
 
         result_low_feedin = optimize_battery_schedule(
             battery_config=battery_config,
@@ -496,28 +442,26 @@ class TestOptimizeBatterySchedule:
         # With low feed-in, storing PV is more attractive
         # With high feed-in, exporting is more attractive
         # Costs should differ
-        assert result_low_feedin.total_cost != result_high_feedin.total_cost
+        assert result_low_feedin.total_cost != pytest.approx(
+            result_high_feedin.total_cost, rel=1e-3
+        )
 
 
 class TestFindNearestSocIdx:
     """Tests for _find_nearest_soc_idx helper."""
 
-    def test_exact_match(self):
-        states = [1000, 2000, 3000, 4000, 5000]
-        assert _find_nearest_soc_idx(3000, states) == 2
-
-    def test_between_states(self):
-        states = [1000, 2000, 3000, 4000, 5000]
-        assert _find_nearest_soc_idx(2400, states) == 1  # Closer to 2000
-        assert _find_nearest_soc_idx(2600, states) == 2  # Closer to 3000
-
-    def test_below_range(self):
-        states = [1000, 2000, 3000]
-        assert _find_nearest_soc_idx(500, states) == 0
-
-    def test_above_range(self):
-        states = [1000, 2000, 3000]
-        assert _find_nearest_soc_idx(5000, states) == 2
+    @pytest.mark.parametrize(
+        ("soc_wh", "expected"),
+        [
+            pytest.param(3000, 2, id="exact_match"),
+            pytest.param(2400, 1, id="closer_to_lower"),
+            pytest.param(2600, 2, id="closer_to_upper"),
+            pytest.param(500, 0, id="below_range"),
+            pytest.param(6500, 4, id="above_range"),
+        ],
+    )
+    def test_nearest(self, soc_wh, expected):
+        assert _find_nearest_soc_idx(soc_wh, STATES_5) == expected
 
 
 class TestActionSpace:
@@ -539,13 +483,13 @@ class TestActionSpace:
             current_soc_kwh=5.0,
             price_forecast=[0.05] * 4 + [0.35] * 4,
             feed_in_forecast=None,
-            pv_forecast=[0.0] * 8,
-            consumption_forecast=[0.5] * 8,
+            pv_forecast=ZERO_PV_8,
+            consumption_forecast=FLAT_CONSUMPTION_8,
             time_step_minutes=15,
         )
-        for power in result.power_schedule_kw:
-            assert power <= config.max_charge_power_kw + 1e-6
-            assert power >= -config.max_discharge_power_kw - 1e-6
+        power = result.power_schedule_kw
+        assert max(power) <= config.max_charge_power_kw + 1e-6
+        assert min(power) >= -config.max_discharge_power_kw - 1e-6
 
     def test_schedule_power_bounded(self, battery_config):
         """Scheduled power should never exceed rated limits."""
@@ -554,15 +498,15 @@ class TestActionSpace:
             current_soc_kwh=5.0,
             price_forecast=[0.02] * 4 + [0.40] * 4,
             feed_in_forecast=None,
-            pv_forecast=[0.0] * 8,
-            consumption_forecast=[0.5] * 8,
+            pv_forecast=ZERO_PV_8,
+            consumption_forecast=FLAT_CONSUMPTION_8,
             time_step_minutes=15,
             degradation_cost_per_kwh=0.001,
             min_price_spread=0.0,
         )
-        for power in result.power_schedule_kw:
-            assert power <= battery_config.max_charge_power_kw + 1e-6
-            assert power >= -battery_config.max_discharge_power_kw - 1e-6
+        power = result.power_schedule_kw
+        assert max(power) <= battery_config.max_charge_power_kw + 1e-6
+        assert min(power) >= -battery_config.max_discharge_power_kw - 1e-6
 
 
 class TestOscillationFilterFormula:
@@ -584,8 +528,8 @@ class TestOscillationFilterFormula:
             current_soc_kwh=5.0,
             price_forecast=[0.10] * 4 + [0.30] * 4,
             feed_in_forecast=None,
-            pv_forecast=[0.0] * 8,
-            consumption_forecast=[0.5] * 8,
+            pv_forecast=ZERO_PV_8,
+            consumption_forecast=FLAT_CONSUMPTION_8,
             time_step_minutes=15,
             degradation_cost_per_kwh=deg,
             min_price_spread=min_spread,
@@ -614,35 +558,43 @@ class TestOscillationFilterFormula:
             current_soc_kwh=5.0,
             price_forecast=[low_price] * 4 + [high_price] * 4,
             feed_in_forecast=feed_in,
-            pv_forecast=[0.0] * 8,
-            consumption_forecast=[0.5] * 8,
+            pv_forecast=ZERO_PV_8,
+            consumption_forecast=FLAT_CONSUMPTION_8,
             time_step_minutes=15,
             degradation_cost_per_kwh=deg,
             min_price_spread=min_spread,
         )
-        n = len(result.mode_schedule)
-        has_charge_then_discharge = any(
-            result.mode_schedule[i] == "charging"
-            and any(
-                result.mode_schedule[j] == "discharging"
-                for j in range(i + 1, min(i + 8, n))
-            )
-            for i in range(n)
-        )
+        # A discharge within 7 steps after a charge; the latest charge is the
+        # closest one, so a single pass tracking it is enough.
+        has_charge_then_discharge = False
+        last_charge = -8
+        for i, mode in enumerate(result.mode_schedule):
+            if mode == "charging":
+                last_charge = i
+            elif mode == "discharging" and i - last_charge < 8:
+                has_charge_then_discharge = True
+                break
         assert not has_charge_then_discharge, "Should not arbitrage with tiny spread"
 
 
 class TestOscillationPrevention:
     """Tests for oscillation prevention in optimizer."""
 
-    def test_no_oscillation_with_small_price_differences(self, battery_config):
+    @pytest.mark.parametrize(
+        "repeats",
+        [
+            pytest.param(2, id="16_steps"),
+            pytest.param(4, id="32_steps", marks=pytest.mark.slow),
+        ],
+    )
+    def test_no_oscillation_with_small_price_differences(self, battery_config, repeats):
         """Optimizer should not oscillate when price differences are too small."""
         # Small price variations (not enough for profitable arbitrage)
         # RTE=0.9, degradation=0.03, min_spread=0.05
         # Need ~0.15 EUR/kWh spread for profitability
-        price_forecast = [0.25, 0.25, 0.24, 0.24, 0.26, 0.26, 0.25, 0.25] * 4
-        pv_forecast = [0.0] * 32  # No PV
-        consumption_forecast = [0.5] * 32  # Constant load
+        price_forecast = [0.25, 0.25, 0.24, 0.24, 0.26, 0.26, 0.25, 0.25] * repeats
+        pv_forecast = [0.0] * len(price_forecast)  # No PV
+        consumption_forecast = [0.5] * len(price_forecast)  # Constant load
 
         result = optimize_battery_schedule(
             battery_config=battery_config,
@@ -669,12 +621,23 @@ class TestOscillationPrevention:
         # Should have very few or no switches with such small price variations
         assert mode_switches <= 2, f"Too many mode switches: {mode_switches}"
 
-    def test_allows_profitable_arbitrage(self, battery_config):
+    @pytest.mark.parametrize(
+        "price_forecast",
+        [
+            # Trailing cheap steps keep discharging at the peak worthwhile
+            pytest.param([0.10] * 4 + [0.35] * 4 + [0.10] * 2, id="10_steps"),
+            pytest.param(
+                [0.10, 0.10, 0.10, 0.10, 0.35, 0.35, 0.35, 0.35] * 2,
+                id="16_steps",
+                marks=pytest.mark.slow,
+            ),
+        ],
+    )
+    def test_allows_profitable_arbitrage(self, battery_config, price_forecast):
         """Optimizer should still allow arbitrage when profitable."""
         # Large price difference: cheap night, expensive peak
-        price_forecast = [0.10, 0.10, 0.10, 0.10, 0.35, 0.35, 0.35, 0.35] * 2
-        pv_forecast = [0.0] * 16
-        consumption_forecast = [0.5] * 16
+        pv_forecast = [0.0] * len(price_forecast)
+        consumption_forecast = [0.5] * len(price_forecast)
 
         result = optimize_battery_schedule(
             battery_config=battery_config,
@@ -693,16 +656,25 @@ class TestOscillationPrevention:
         # Should discharge during expensive periods
         assert any(mode == "discharging" for mode in result.mode_schedule[4:8])
 
-    def test_allows_pv_arbitrage_with_feed_in(self, battery_config):
+    @pytest.mark.parametrize(
+        "evening_steps",
+        [
+            pytest.param(4, id="12_steps"),
+            pytest.param(8, id="16_steps", marks=pytest.mark.slow),
+        ],
+    )
+    def test_allows_pv_arbitrage_with_feed_in(self, battery_config, evening_steps):
         """Optimizer should charge during PV when can't discharge enough beforehand."""
         # Low starting SoC scenario: can't discharge much in morning,
         # so charging during PV for evening discharge becomes optimal
-        grid_price = [0.24] * 4 + [0.25] * 4 + [0.30] * 8  # Evening expensive
-        feed_in_price = [0.07] * 16  # Low feed-in price
+        n = 8 + evening_steps
+        # Evening expensive
+        grid_price = [0.24] * 4 + [0.25] * 4 + [0.30] * evening_steps
+        feed_in_price = [0.07] * n  # Low feed-in price
 
         # PV surplus in middle period
-        pv_forecast = [0.0] * 4 + [2.0] * 4 + [0.0] * 8  # 2kW PV midday
-        consumption_forecast = [0.5] * 16  # 0.5kW constant load
+        pv_forecast = [0.0] * 4 + [2.0] * 4 + [0.0] * evening_steps  # 2kW PV midday
+        consumption_forecast = [0.5] * n  # 0.5kW constant load
 
         result = optimize_battery_schedule(
             battery_config=battery_config,
@@ -721,7 +693,7 @@ class TestOscillationPrevention:
             1 for mode in result.mode_schedule[4:8] if mode == "charging"
         )
 
-        # Should discharge during evening high prices (steps 8-15)
+        # Should discharge during evening high prices (steps 8 onwards)
         discharge_count = sum(
             1 for mode in result.mode_schedule[8:] if mode == "discharging"
         )
@@ -2,26 +2,59 @@
 
 import pytest
 
-from custom_components.battery_controller.battery_model import BatteryConfig
 from custom_components.battery_controller.zero_grid_controller import (
     ZeroGridController,
     ZeroGridControllerConfig,
+    apply_deadband_batch,
     create_zero_grid_controller,
 )
 
-
-@pytest.fixture
-def battery_config():
-    return BatteryConfig(
-        capacity_kwh=10.0,
-        max_charge_power_kw=5.0,
-        max_discharge_power_kw=5.0,
-        min_soc_percent=10.0,
-        max_soc_percent=90.0,
-    )
-
-
-@pytest.fixture
+pytestmark = pytest.mark.unit
+
+# Expected values shared by the tables and asserts below
+APPROX_NEG_1K = pytest.approx(-1000, abs=10)
+APPROX_2K = pytest.approx(2000, abs=10)
+APPROX_MAX_DISCHARGE = pytest.approx(-5000)
+APPROX_MAX_CHARGE = pytest.approx(5000)
+APPROX_50PCT = pytest.approx(50.0)
+
+# (mode, grid W, SoC kWh, DP schedule W, expected setpoint W)
+SETPOINT_CASES = [
+    # zero_grid compensates the grid exchange (import -> discharge)
+    pytest.param("zero_grid", 1000, 5.0, 0, APPROX_NEG_1K, id="zero_grid-import"),
+    pytest.param("zero_grid", -2000, 5.0, 0, APPROX_2K, id="zero_grid-export"),
+    pytest.param("zero_grid", 0, 5.0, 0, 0.0, id="zero_grid-balanced"),
+    pytest.param(
+        "zero_grid", 8000, 5.0, 0, APPROX_MAX_DISCHARGE, id="zero_grid-max_discharge"
+    ),
+    # follow_schedule ignores the grid and follows the DP schedule
+    pytest.param(
+        "follow_schedule", 1000, 5.0, 2000, pytest.approx(2000), id="follow-charge"
+    ),
+    pytest.param(
+        "follow_schedule", 0, 5.0, -3000, pytest.approx(-3000), id="follow-discharge"
+    ),
+    pytest.param(
+        "follow_schedule", 0, 5.0, 8000, APPROX_MAX_CHARGE, id="follow-max_charge"
+    ),
+    # idle preserves the battery whatever the grid or schedule says
+    pytest.param("idle", 1000, 5.0, 0, 0.0, id="idle-import"),
+    pytest.param("idle", -2000, 5.0, 0, 0.0, id="idle-pv_surplus"),
+    pytest.param("idle", 0, 5.0, 0, 0.0, id="idle-balanced"),
+    pytest.param("idle", 1000, 5.0, -5000, 0.0, id="idle-ignores_schedule"),
+    # manual and unknown modes apply no automatic control
+    pytest.param("manual", 5000, 5.0, 3000, 0.0, id="manual"),
+    pytest.param("unknown_mode", 1000, 5.0, 2000, 0.0, id="unknown_mode"),
+]
+
+# (grid W, SoC kWh) at the 10 kWh battery's SoC limits (10% / 90%)
+SOC_LIMIT_CASES = [
+    pytest.param(2000, 1.0, id="min_soc_no_discharge"),
+    pytest.param(-2000, 9.0, id="max_soc_no_charge"),
+]
+
+
+@pytest.fixture(scope="module")
 def controller_config():
     return ZeroGridControllerConfig(
         max_charge_w=5000.0,
@@ -30,217 +63,138 @@ def controller_config():
     )
 
 
-@pytest.fixture
+# One controller per module; only its deadband state changes between tests
+@pytest.fixture(scope="module")
 def controller(controller_config, battery_config):
     return ZeroGridController(controller_config, battery_config)
 
 
-class TestZeroGridMode:
-    """Tests for zero_grid control mode."""
+@pytest.fixture(autouse=True)
+def reset_deadband(controller):
+    """Start every test from a fresh deadband state."""
+    controller._last_target_w = 0.0
 
-    def test_importing_triggers_discharge(self, controller):
-        """When importing from grid, discharge battery."""
-        target = controller.calculate_battery_setpoint(
-            current_grid_w=1000,  # Importing 1 kW
-            current_soc_kwh=5.0,
-            dp_schedule_w=0,
-            mode="zero_grid",
-        )
-        # Should discharge (negative) to compensate
-        assert target < 0
-        assert target == pytest.approx(-1000, abs=10)
 
-    def test_exporting_triggers_charge(self, controller):
-        """When exporting to grid, charge battery."""
-        target = controller.calculate_battery_setpoint(
-            current_grid_w=-2000,  # Exporting 2 kW
-            current_soc_kwh=5.0,
-            dp_schedule_w=0,
-            mode="zero_grid",
-        )
-        assert target > 0
-        assert target == pytest.approx(2000, abs=10)
-
-    def test_zero_grid_at_zero(self, controller):
-        """No grid exchange -> no battery action."""
-        target = controller.calculate_battery_setpoint(
-            current_grid_w=0,
-            current_soc_kwh=5.0,
-            dp_schedule_w=0,
-            mode="zero_grid",
-        )
-        assert target == 0.0
-
-    def test_clamp_to_max_discharge(self, controller):
-        """Large import should be clamped to max discharge."""
-        target = controller.calculate_battery_setpoint(
-            current_grid_w=8000,  # 8 kW import
-            current_soc_kwh=5.0,
-            dp_schedule_w=0,
-            mode="zero_grid",
-        )
-        assert target == pytest.approx(-5000)  # Max discharge
+class TestCalculateBatterySetpoint:
+    """Tests for calculate_battery_setpoint per control mode."""
 
-    def test_soc_limit_prevents_discharge(self, controller):
-        """At min SoC, don't discharge further."""
+    @pytest.mark.parametrize(
+        ("mode", "grid_w", "soc_kwh", "dp_w", "expected"), SETPOINT_CASES
+    )
+    def test_setpoint(self, controller, mode, grid_w, soc_kwh, dp_w, expected):
         target = controller.calculate_battery_setpoint(
-            current_grid_w=2000,
-            current_soc_kwh=1.0,  # At min SoC (10% of 10 kWh)
-            dp_schedule_w=0,
-            mode="zero_grid",
+            current_grid_w=grid_w,
+            current_soc_kwh=soc_kwh,
+            dp_schedule_w=dp_w,
+            mode=mode,
         )
-        assert target == 0.0  # Can't discharge
+        assert target == expected
 
-    def test_soc_limit_prevents_charge(self, controller):
-        """At max SoC, don't charge further."""
+    @pytest.mark.parametrize(("grid_w", "soc_kwh"), SOC_LIMIT_CASES)
+    def test_soc_limit_blocks_zero_grid(self, controller, grid_w, soc_kwh):
         target = controller.calculate_battery_setpoint(
-            current_grid_w=-2000,
-            current_soc_kwh=9.0,  # At max SoC (90% of 10 kWh)
+            current_grid_w=grid_w,
+            current_soc_kwh=soc_kwh,
             dp_schedule_w=0,
             mode="zero_grid",
         )
-        assert target == 0.0  # Can't charge
-
-
-class TestFollowScheduleMode:
-    """Tests for follow_schedule control mode."""
-
-    def test_follows_dp_schedule(self, controller):
-        """Should follow DP schedule exactly."""
-        target = controller.calculate_battery_setpoint(
-            current_grid_w=1000,  # Ignored in follow_schedule
-            current_soc_kwh=5.0,
-            dp_schedule_w=2000,  # DP says charge at 2kW
-            mode="follow_schedule",
-        )
-        assert target == pytest.approx(2000)
-
-    def test_follows_discharge_schedule(self, controller):
-        target = controller.calculate_battery_setpoint(
-            current_grid_w=0,
-            current_soc_kwh=5.0,
-            dp_schedule_w=-3000,  # DP says discharge at 3kW
-            mode="follow_schedule",
-        )
-        assert target == pytest.approx(-3000)
-
-    def test_schedule_clamped_to_max(self, controller):
-        target = controller.calculate_battery_setpoint(
-            current_grid_w=0,
-            current_soc_kwh=5.0,
-            dp_schedule_w=8000,  # Beyond max charge
-            mode="follow_schedule",
-        )
-        assert target == pytest.approx(5000)
-
-
-class TestUnknownMode:
-    """Unknown mode falls through to manual (returns 0)."""
-
-    def test_unknown_mode_returns_zero(self, controller):
-        target = controller.calculate_battery_setpoint(
-            current_grid_w=1000,
-            current_soc_kwh=5.0,
-            dp_schedule_w=2000,
-            mode="unknown_mode",
-        )
-        assert target == 0.0
-
-
-class TestIdleMode:
-    """Tests for idle control mode (preserve battery for peak pricing)."""
-
-    def test_idle_no_discharge_when_importing(self, controller):
-        """When grid is importing, idle mode should NOT discharge battery."""
-        target = controller.calculate_battery_setpoint(
-            current_grid_w=1000,  # Importing 1 kW from grid
-            current_soc_kwh=5.0,
-            dp_schedule_w=0,
-            mode="idle",
-        )
-        assert target == 0.0  # Preserve battery capacity
-
-    def test_idle_does_nothing_with_pv_surplus(self, controller):
-        """Idle mode does nothing, even with PV surplus."""
-        target = controller.calculate_battery_setpoint(
-            current_grid_w=-2000,  # Exporting 2 kW (PV surplus)
-            current_soc_kwh=5.0,
-            dp_schedule_w=0,
-            mode="idle",
-        )
-        assert target == 0.0  # True idle: no charge, no discharge
-
-    def test_idle_zero_grid_no_action(self, controller):
-        """When grid is balanced, idle mode does nothing."""
-        target = controller.calculate_battery_setpoint(
-            current_grid_w=0,
-            current_soc_kwh=5.0,
-            dp_schedule_w=0,
-            mode="idle",
-        )
-        assert target == 0.0
-
-    def test_idle_ignores_dp_schedule(self, controller):
-        """Idle mode ignores DP schedule completely."""
-        target = controller.calculate_battery_setpoint(
-            current_grid_w=1000,
-            current_soc_kwh=5.0,
-            dp_schedule_w=-5000,  # DP says discharge hard
-            mode="idle",
-        )
-        assert target == 0.0  # Idle overrides everything
-
-
-class TestManualMode:
-    """Tests for manual control mode."""
-
-    def test_manual_returns_zero(self, controller):
-        target = controller.calculate_battery_setpoint(
-            current_grid_w=5000,
-            current_soc_kwh=5.0,
-            dp_schedule_w=3000,
-            mode="manual",
-        )
         assert target == 0.0
 
 
 class TestDeadband:
     """Tests for deadband hysteresis."""
 
-    def test_within_deadband_no_change(self, controller):
-        # Set previous target
-        controller._last_target_w = 1000
-        result = controller.apply_deadband(target_w=1020)
-        assert result == 1000  # Within 50W deadband
-
-    def test_exceeds_deadband_changes(self, controller):
-        # Set previous target
-        controller._last_target_w = 1000
-        result = controller.apply_deadband(target_w=1100)
-        assert result == 1100  # Exceeds 50W deadband
-
-    def test_first_call_no_deadband(self, controller):
-        # First call with _last_target_w = 0
-        result = controller.apply_deadband(target_w=1000)
-        assert result == 1000  # No previous target, apply new target
+    @pytest.mark.parametrize(
+        ("last_w", "target_w", "expected"),
+        [
+            pytest.param(1000, 1020, 1000, id="within_deadband_no_change"),
+            pytest.param(1000, 1100, 1100, id="exceeds_deadband_changes"),
+            pytest.param(0, 1000, 1000, id="first_call_no_deadband"),
+        ],
+    )
+    def test_deadband(self, controller, last_w, target_w, expected):
+        # Deadband is 50 W around the previous target
+        controller._last_target_w = last_w
+        assert controller.apply_deadband(target_w=target_w) == expected
+
+
+class TestRunBatch:
+    """Tests for batch evaluation over a series of samples."""
+
+    def test_deadband_batch(self):
+        final, last = apply_deadband_batch([1020.0, 1100.0, 1130.0, 0.0], 1000.0, 50.0)
+        assert final == [1000.0, 1100.0, 1100.0, 0.0]
+        assert last == 0.0
+
+    def test_matches_get_control_action(self, controller_config, battery_config):
+        grid = [1000.0, 20.0, -3000.0, 8000.0, -40.0]
+        soc = [5.0, 5.0, 5.0, 1.0, 9.0]
+        dp = [0.0, 2000.0, -1000.0, 3000.0, 0.0]
+        for mode in ("zero_grid", "follow_schedule", "idle", "manual"):
+            stepwise = ZeroGridController(controller_config, battery_config)
+            expected = [
+                stepwise.get_control_action(g, s, 0.0, d, mode)["target_power_w"]
+                for g, s, d in zip(grid, soc, dp)
+            ]
+            batch = ZeroGridController(controller_config, battery_config)
+            assert batch.run_batch(grid, soc, dp, mode) == expected
+            assert batch._last_target_w == stepwise._last_target_w
+
+    def test_compiled_step_matches_get_control_action(
+        self, controller_config, battery_config
+    ):
+        grid = [1000.0, 20.0, -3000.0, 8000.0, -40.0]
+        soc = [5.0, 5.0, 5.0, 1.0, 9.0]
+        dp = [0.0, 2000.0, -1000.0, 3000.0, 0.0]
+        for mode in ("zero_grid", "follow_schedule", "idle", "manual"):
+            stepwise = ZeroGridController(controller_config, battery_config)
+            compiled = ZeroGridController(controller_config, battery_config)
+            step = compiled.compile_for_mode(mode)
+            for g, s, d in zip(grid, soc, dp):
+                action = stepwise.get_control_action(g, s, 0.0, d, mode)
+                assert step(g, s, d) == action["target_power_w"]
+            assert compiled._last_target_w == stepwise._last_target_w
+
+    @pytest.mark.parametrize(
+        ("last_w", "expected"),
+        [
+            pytest.param(30.0, 30.0, id="held_within_deadband"),
+            pytest.param(1000.0, 0.0, id="released_outside_deadband"),
+        ],
+    )
+    def test_compiled_idle_step(self, controller, last_w, expected):
+        controller._last_target_w = last_w
+        step = controller.compile_for_mode("idle")
+        assert step(-2000.0, 5.0, 3000.0) == expected
+        assert controller._last_target_w == expected
 
 
 class TestGetControlAction:
     """Tests for get_control_action."""
 
-    def test_returns_dict(self, controller):
+    @pytest.mark.parametrize(
+        ("grid_w", "dp_w", "mode"),
+        [
+            pytest.param(500, 1000, "hybrid", id="hybrid"),
+            pytest.param(0, 0, "manual", id="manual"),
+        ],
+    )
+    def test_returns_dict_with_soc_percent(self, controller, grid_w, dp_w, mode):
         action = controller.get_control_action(
-            current_grid_w=500,
+            current_grid_w=grid_w,
             current_soc_kwh=5.0,
             current_battery_w=0,
-            dp_schedule_w=1000,
-            mode="hybrid",
+            dp_schedule_w=dp_w,
+            mode=mode,
         )
         assert isinstance(action, dict)
-        assert "target_power_w" in action
-        assert "target_power_kw" in action
-        assert "action_mode" in action
-        assert "soc_percent" in action
+        assert {
+            "target_power_w",
+            "target_power_kw",
+            "action_mode",
+            "soc_percent",
+        } <= action.keys()
+        assert action["soc_percent"] == APPROX_50PCT
 
     def test_action_mode_charging(self, controller):
         action = controller.get_control_action(
@@ -262,16 +216,6 @@ class TestGetControlAction:
         )
         assert action["action_mode"] == "discharging"
 
-    def test_soc_percent_calculation(self, controller):
-        action = controller.get_control_action(
-            current_grid_w=0,
-            current_soc_kwh=5.0,
-            current_battery_w=0,
-            dp_schedule_w=0,
-            mode="manual",
-        )
-        assert action["soc_percent"] == pytest.approx(50.0)
-
 
 class TestCreateZeroGridController:
     """Tests for create_zero_grid_controller factory."""